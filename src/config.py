@@ -11,3 +11,19 @@ class Cofiguration:
     
     # Cloudflare bypass configuration
     cloudflare_max_attempts = 20  # Maximum attempts to bypass Cloudflare challenge
+    
+    # Chrome memory governor configuration
+    chrome_memory_budget_mb = 4096  # Total Chrome process-tree memory (PSS) before new tabs/fetches wait
+    chrome_memory_sample_interval = 2  # Seconds between memory samples
+    chrome_admission_timeout = 60  # Seconds a request waits for memory headroom before failing
+    chrome_renderer_process_limit = 4  # Max renderer processes per Chrome instance
+    chrome_js_heap_limit_mb = 512  # V8 old-space limit per renderer
+    chrome_min_dev_shm_mb = 512  # Use --disable-dev-shm-usage only when /dev/shm is smaller than this
+    chrome_relief_cooldown = 10  # Min seconds between pressure relief runs (garbage collection / recycle)
+    chrome_retry_interval = 30  # Min seconds between attempts to relaunch a failed Chrome
+    max_tabs = 10  # Max concurrent tabs (fastapi_chrome_server.py)
+    
+    # Driver pool configuration (playwright_server.py)
+    driver_pool_size = 5  # Number of Chrome drivers in the pool
+    driver_memory_limit_mb = None  # Per-driver memory limit; None = budget split across live drivers
+    driver_retry_interval = 30  # Min seconds between relaunches of failed pool drivers
@@ -9,10 +9,17 @@ import atexit
 import signal
 from config import Cofiguration
 from contextlib import asynccontextmanager
+from memory_governor import MemoryGovernor, browser_pid, chrome_memory_flags, collect_garbage, terminate_chrome
+
+# Configuration
+MAX_TABS = getattr(Cofiguration, 'max_tabs', 10)
+CHROME_RETRY_INTERVAL = getattr(Cofiguration, 'chrome_retry_interval', 30)
 
 # Global Chrome driver
 _global_driver = None
-_semaphore = asyncio.Semaphore(10)  # Max 10 concurrent requests
+_semaphore = asyncio.Semaphore(MAX_TABS)  # Max concurrent tabs
+_init_lock = asyncio.Lock()
+_last_init_attempt = None
 
 
 class FetchRequest(BaseModel):
@@ -30,7 +37,9 @@ class FetchResponse(BaseModel):
 
 def initialize_chrome():
     """Initialize persistent Chrome driver"""
-    global _global_driver
+    global _global_driver, _last_init_attempt
+    
+    _last_init_attempt = time.monotonic()
     
     try:
         print("[*] Initializing persistent Chrome driver...")
@@ -38,12 +47,13 @@ def initialize_chrome():
         options = uc.ChromeOptions()
         options.add_argument("--no-sandbox")
         options.add_argument("--disable-gpu")
-        options.add_argument("--disable-dev-shm-usage")
         options.add_argument("--disable-software-rasterizer")
         options.add_argument("--disable-plugins")
         options.add_argument("--no-default-browser-check")
         options.add_argument("--no-first-run")
         options.add_argument("--window-size=1920,1080")
+        for flag in chrome_memory_flags():
+            options.add_argument(flag)
         
         user_data_dir = '/tmp/chrome_profile_fastapi'
         options.add_argument(f'--user-data-dir={user_data_dir}')
@@ -70,11 +80,49 @@ def cleanup_chrome():
     try:
         if _global_driver:
             print("[*] Closing Chrome driver...")
-            _global_driver.quit()
-            _global_driver = None
+            terminate_chrome(_global_driver)
             print("[+] Chrome driver closed")
     except Exception as e:
         print(f"[!] Error closing driver: {e}")
+    finally:
+        _global_driver = None
+
+
+def relieve_memory_pressure(memory_mb, in_flight):
+    """Collect garbage first; recycle Chrome if idle and still over budget on a later cycle"""
+    if _global_driver is None:
+        return
+    
+    if _governor.relief_runs == 0:
+        print("[*] Memory pressure - collecting garbage...")
+        collect_garbage(_global_driver)
+        return
+    
+    # Recycling would kill open tabs, so only do it when no request is in flight
+    if in_flight == 0:
+        print("[*] Memory pressure persists - recycling Chrome driver...")
+        cleanup_chrome()
+        if not initialize_chrome():
+            print(f"[-] Chrome relaunch failed - retrying on next request after {CHROME_RETRY_INTERVAL}s")
+
+
+async def ensure_chrome():
+    """Lazily re-initialize Chrome if it is down, at most once per retry interval"""
+    async with _init_lock:
+        if _global_driver is not None:
+            return True
+        
+        if _last_init_attempt is not None and time.monotonic() - _last_init_attempt < CHROME_RETRY_INTERVAL:
+            return False
+        
+        print("[*] Chrome driver is down - re-initializing...")
+        return await asyncio.to_thread(initialize_chrome)
+
+
+_governor = MemoryGovernor(
+    get_pids=lambda: [browser_pid(_global_driver)] if _global_driver else [],
+    on_pressure=relieve_memory_pressure
+)
 
 
 def bypass_cloudflare(driver, max_attempts=20):
@@ -129,7 +177,7 @@ async def fetch_url_with_tab(url: str, timeout: int):
     """Fetch URL in a new tab with Cloudflare bypass"""
     global _global_driver
     
-    if _global_driver is None:
+    if not await ensure_chrome():
         return FetchResponse(
             success=False,
             html=None,
@@ -272,9 +320,24 @@ async def fetch_page(request: FetchRequest):
     - **url**: The URL to fetch
     - **timeout**: Timeout in seconds (default: 30)
     """
-    async with _semaphore:  # Limit to 10 concurrent requests
+    async with _semaphore:  # Limit concurrent tabs
         print(f"[*] Received request for URL: {request.url} (timeout: {request.timeout}s)")
-        response = await fetch_url_with_tab(request.url, request.timeout)
+        
+        # Wait for memory headroom before opening another tab
+        if not await _governor.admit():
+            return FetchResponse(
+                success=False,
+                html=None,
+                final_url=None,
+                cloudflare_bypassed=False,
+                error="Chrome memory budget exceeded, try again later"
+            )
+        
+        try:
+            response = await fetch_url_with_tab(request.url, request.timeout)
+        finally:
+            _governor.release()
+        
         print(f"[+] Request completed - Success: {response.success}")
         return response
 
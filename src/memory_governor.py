@@ -0,0 +1,261 @@
+import asyncio
+import os
+import signal
+import time
+from config import Cofiguration
+
+# Configuration
+MEMORY_BUDGET_MB = getattr(Cofiguration, 'chrome_memory_budget_mb', 4096)
+MEMORY_SAMPLE_INTERVAL = getattr(Cofiguration, 'chrome_memory_sample_interval', 2)
+ADMISSION_TIMEOUT = getattr(Cofiguration, 'chrome_admission_timeout', 60)
+RENDERER_PROCESS_LIMIT = getattr(Cofiguration, 'chrome_renderer_process_limit', 4)
+JS_HEAP_LIMIT_MB = getattr(Cofiguration, 'chrome_js_heap_limit_mb', 512)
+RELIEF_COOLDOWN = getattr(Cofiguration, 'chrome_relief_cooldown', 10)
+MIN_DEV_SHM_MB = getattr(Cofiguration, 'chrome_min_dev_shm_mb', 512)
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+# Drivers already warned about a missing browser PID
+_pid_warned = set()
+
+
+def dev_shm_mb():
+    """Size of /dev/shm in MB, or 0 if it can't be read"""
+    try:
+        st = os.statvfs('/dev/shm')
+        return st.f_blocks * st.f_frsize / (1024 * 1024)
+    except (OSError, AttributeError):
+        return 0.0
+
+
+def chrome_memory_flags():
+    """Launch flags capping renderer processes and per-tab JS heap"""
+    flags = [
+        f"--renderer-process-limit={RENDERER_PROCESS_LIMIT}",
+        f"--js-flags=--max-old-space-size={JS_HEAP_LIMIT_MB}",
+    ]
+
+    # Chrome crashes when a small /dev/shm (e.g. Docker's 64MB default) fills
+    # up, but moving shared memory to /tmp costs disk I/O and hides it from
+    # tmpfs limits - so only do it when /dev/shm is actually too small
+    if dev_shm_mb() < MIN_DEV_SHM_MB:
+        flags.append("--disable-dev-shm-usage")
+
+    return flags
+
+
+def browser_pid(driver):
+    """Return the PID of the Chrome browser process behind a driver"""
+    # undetected-chromedriver records the browser PID when use_subprocess=True
+    pid = getattr(driver, 'browser_pid', None)
+    if pid:
+        return pid
+
+    # uc launches Chrome itself, so the chromedriver process tree would not
+    # include it - better to measure nothing than the wrong tree
+    if id(driver) not in _pid_warned:
+        _pid_warned.add(id(driver))
+        print("[!] Chrome browser PID unavailable - memory of this driver is not tracked")
+    return None
+
+
+def _parent_map():
+    """Map every PID in /proc to its parent PID"""
+    parents = {}
+
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                stat = f.read()
+            # Fields after the "(comm)" are: state, ppid, ...
+            ppid = int(stat.rsplit(')', 1)[1].split()[1])
+            parents[int(entry)] = ppid
+        except (OSError, IndexError, ValueError):
+            continue
+
+    return parents
+
+
+def process_tree_pids(root_pids):
+    """Return the given PIDs plus all of their descendants"""
+    roots = {pid for pid in root_pids if pid}
+    if not roots:
+        return set()
+
+    children = {}
+    for pid, ppid in _parent_map().items():
+        children.setdefault(ppid, []).append(pid)
+
+    tree = set()
+    stack = list(roots)
+    while stack:
+        pid = stack.pop()
+        if pid in tree:
+            continue
+        tree.add(pid)
+        stack.extend(children.get(pid, []))
+
+    return tree
+
+
+def _process_memory_kb(pid):
+    """
+    Proportional set size (kB) of one process.
+
+    Shared libraries and shared-memory segments are split across the
+    processes mapping them, so summing PSS over Chrome's browser, zygote,
+    GPU and renderer processes doesn't count shared pages once per process.
+    Falls back to RSS from statm on kernels without smaps_rollup.
+    """
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                if line.startswith('Pss:'):
+                    return int(line.split()[1])
+    except (OSError, IndexError, ValueError):
+        pass
+
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE // 1024
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def process_tree_memory_mb(root_pids):
+    """Sum memory (MB, PSS) of the process trees rooted at root_pids"""
+    if not os.path.isdir('/proc'):
+        return 0.0
+
+    total_kb = sum(_process_memory_kb(pid) for pid in process_tree_pids(root_pids))
+    return total_kb / 1024
+
+
+def kill_process_tree(pids):
+    """SIGKILL every PID in pids, ignoring ones that already exited"""
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            continue
+
+
+def terminate_chrome(driver):
+    """
+    Quit a driver and make sure its Chrome process tree is gone.
+
+    The tree is snapshotted before quit() so that a failed quit can't leave
+    an orphaned Chrome running outside the memory budget. Errors from quit()
+    still propagate after the tree is killed.
+    """
+    pid = browser_pid(driver)
+    tree = process_tree_pids([pid]) if pid and os.path.isdir('/proc') else set()
+
+    try:
+        driver.quit()
+    finally:
+        kill_process_tree(tree)
+
+
+def collect_garbage(driver):
+    """Force a major V8 garbage collection in the driver's current page"""
+    try:
+        driver.execute_cdp_cmd('HeapProfiler.collectGarbage', {})
+        return True
+    except Exception as e:
+        print(f"[!] Failed to collect garbage: {e}")
+        return False
+
+
+class MemoryGovernor:
+    """
+    Gates admission of new tabs/fetches on a global Chrome memory budget.
+
+    - **get_pids**: Callable returning the root Chrome PIDs to sample
+    - **on_pressure**: Optional callable(memory_mb, in_flight) run when over budget,
+      at most once per relief_cooldown seconds. Coroutine functions are awaited,
+      plain functions run in the thread pool. relief_runs counts the earlier runs
+      in the current over-budget episode, so callbacks can escalate.
+    """
+
+    def __init__(self, get_pids, on_pressure=None, budget_mb=MEMORY_BUDGET_MB,
+                 sample_interval=MEMORY_SAMPLE_INTERVAL, admission_timeout=ADMISSION_TIMEOUT,
+                 relief_cooldown=RELIEF_COOLDOWN):
+        self.get_pids = get_pids
+        self.on_pressure = on_pressure
+        self.budget_mb = budget_mb
+        self.sample_interval = sample_interval
+        self.admission_timeout = admission_timeout
+        self.relief_cooldown = relief_cooldown
+        self.in_flight = 0
+        self._lock = asyncio.Lock()
+        self._last_memory = 0.0
+        self._last_sample_time = None
+        self._over_budget = False
+        self.relief_runs = 0
+        self._last_relief_time = None
+
+    def sample_memory_mb(self, force=False):
+        """Sample Chrome process-tree memory, cached for sample_interval seconds"""
+        now = time.monotonic()
+        if (force or self._last_sample_time is None
+                or now - self._last_sample_time >= self.sample_interval):
+            self._last_memory = process_tree_memory_mb(self.get_pids())
+            self._last_sample_time = now
+        return self._last_memory
+
+    async def admit(self):
+        """
+        Wait for memory headroom and reserve a slot.
+
+        Returns False if the budget stayed exceeded for admission_timeout seconds.
+        One request is always admitted when nothing is in flight so the
+        server never deadlocks on a budget it cannot get under.
+        """
+        deadline = time.monotonic() + self.admission_timeout
+
+        while True:
+            async with self._lock:
+                memory = await asyncio.to_thread(self.sample_memory_mb)
+
+                if memory >= self.budget_mb:
+                    # Log the transition, not every waiter's every poll
+                    if not self._over_budget:
+                        self._over_budget = True
+                        print(f"[!] Chrome memory {memory:.0f}MB over budget {self.budget_mb}MB "
+                              f"({self.in_flight} in flight)")
+                    if self.on_pressure and self._relief_due():
+                        self._last_relief_time = time.monotonic()
+                        if asyncio.iscoroutinefunction(self.on_pressure):
+                            await self.on_pressure(memory, self.in_flight)
+                        else:
+                            await asyncio.to_thread(self.on_pressure, memory, self.in_flight)
+                        self.relief_runs += 1
+                        memory = await asyncio.to_thread(self.sample_memory_mb, True)
+
+                if memory < self.budget_mb and self._over_budget:
+                    self._over_budget = False
+                    self.relief_runs = 0
+                    print(f"[+] Chrome memory {memory:.0f}MB back under budget {self.budget_mb}MB")
+
+                if memory < self.budget_mb or self.in_flight == 0:
+                    self.in_flight += 1
+                    return True
+
+            if time.monotonic() >= deadline:
+                print(f"[-] Admission timed out after {self.admission_timeout}s - memory budget exceeded")
+                return False
+
+            await asyncio.sleep(self.sample_interval)
+
+    def _relief_due(self):
+        """Whether relief_cooldown has passed since on_pressure last ran"""
+        if self._last_relief_time is None:
+            return True
+        return time.monotonic() - self._last_relief_time >= self.relief_cooldown
+
+    def release(self):
+        """Release a slot reserved by admit()"""
+        self.in_flight = max(0, self.in_flight - 1)
@@ -9,13 +9,23 @@ from config import Cofiguration
 from contextlib import asynccontextmanager
 import os
 import shutil
+from memory_governor import (
+    MemoryGovernor, MEMORY_BUDGET_MB, ADMISSION_TIMEOUT, browser_pid,
+    chrome_memory_flags, collect_garbage, terminate_chrome, process_tree_memory_mb
+)
 
 # Configuration
 DRIVER_POOL_SIZE = getattr(Cofiguration, 'driver_pool_size', 5)
+DRIVER_MEMORY_LIMIT_MB = getattr(Cofiguration, 'driver_memory_limit_mb', None)  # None = budget split across live drivers
+DRIVER_RETRY_INTERVAL = getattr(Cofiguration, 'driver_retry_interval', 30)
 
 # Global driver pool
 _driver_pool = []
 _driver_queue = None
+_failed_driver_ids = []  # Slots whose driver failed to launch, retried later
+_refill_lock = asyncio.Lock()
+_last_refill_attempt = None
+_background_tasks = set()
 
 
 class FetchRequest(BaseModel):
@@ -39,13 +49,14 @@ def create_chrome_driver(driver_id):
         options = uc.ChromeOptions()
         options.add_argument("--no-sandbox")
         options.add_argument("--disable-gpu")
-        options.add_argument("--disable-dev-shm-usage")
         options.add_argument("--disable-software-rasterizer")
         options.add_argument("--disable-extensions")
         options.add_argument("--disable-plugins")
         options.add_argument("--no-default-browser-check")
         options.add_argument("--no-first-run")
         options.add_argument("--window-size=1920,1080")
+        for flag in chrome_memory_flags():
+            options.add_argument(flag)
         
         # IMPORTANT: Use shared profile for all drivers to reuse Cloudflare cookies
         user_data_dir = '/tmp/chrome_profile_fastapi'
@@ -82,6 +93,8 @@ def initialize_driver_pool():
         driver_obj = create_chrome_driver(i)
         if driver_obj:
             _driver_pool.append(driver_obj)
+        else:
+            _failed_driver_ids.append(i)
         time.sleep(2)  # Small delay between driver launches
     
     print(f"[+] Driver pool initialized with {len(_driver_pool)}/{DRIVER_POOL_SIZE} drivers")
@@ -102,7 +115,7 @@ def cleanup_driver_pool():
     
     for driver_obj in _driver_pool:
         try:
-            driver_obj['driver'].quit()
+            terminate_chrome(driver_obj['driver'])
             print(f"[+] Driver #{driver_obj['id']} closed")
         except Exception as e:
             print(f"[!] Error closing driver #{driver_obj['id']}: {e}")
@@ -111,6 +124,155 @@ def cleanup_driver_pool():
     print("[+] All drivers closed")
 
 
+def driver_memory_limit_mb():
+    """Per-driver memory limit: configured value, or the budget split across live drivers"""
+    if DRIVER_MEMORY_LIMIT_MB:
+        return DRIVER_MEMORY_LIMIT_MB
+    return MEMORY_BUDGET_MB // max(1, len(_driver_pool))
+
+
+def relieve_driver(driver_obj):
+    """
+    Relieve a driver whose Chrome tree exceeds its memory limit.
+    
+    The first time a driver is over, its page is garbage-collected and it is
+    flagged; it is recycled only if it is still over on a later check.
+    Returns the driver to put back in the pool, or None if recycling failed.
+    """
+    driver_id = driver_obj['id']
+    limit = driver_memory_limit_mb()
+    
+    def _memory():
+        return process_tree_memory_mb([browser_pid(driver_obj['driver'])])
+    
+    memory = _memory()
+    if memory < limit:
+        driver_obj['over_limit'] = False
+        return driver_obj
+    
+    if not driver_obj.get('over_limit'):
+        print(f"[Driver-{driver_id}] Using {memory:.0f}MB (limit {limit}MB) - collecting garbage...")
+        collect_garbage(driver_obj['driver'])
+        driver_obj['over_limit'] = True
+        return driver_obj
+    
+    print(f"[Driver-{driver_id}] Still using {memory:.0f}MB - recycling...")
+    try:
+        terminate_chrome(driver_obj['driver'])
+    except Exception as e:
+        print(f"[!] Error closing driver #{driver_id}: {e}")
+    
+    if driver_obj in _driver_pool:
+        _driver_pool.remove(driver_obj)
+    
+    new_driver_obj = create_chrome_driver(driver_id)
+    if new_driver_obj is None:
+        # Park the slot for refill_driver_pool() rather than handing out a dead driver
+        _failed_driver_ids.append(driver_id)
+        print(f"[-] Driver #{driver_id} removed from pool ({len(_driver_pool)} left), will retry")
+        return None
+    
+    _driver_pool.append(new_driver_obj)
+    return new_driver_obj
+
+
+def spawn_background(coro):
+    """Run a coroutine as a background task, keeping a reference until it finishes"""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+async def refill_driver_pool():
+    """Relaunch failed driver slots, at most once per retry interval"""
+    global _last_refill_attempt
+    
+    async with _refill_lock:
+        if not _failed_driver_ids:
+            return
+        
+        now = time.monotonic()
+        if _last_refill_attempt is not None and now - _last_refill_attempt < DRIVER_RETRY_INTERVAL:
+            return
+        _last_refill_attempt = now
+        
+        for driver_id in list(_failed_driver_ids):
+            driver_obj = await asyncio.to_thread(create_chrome_driver, driver_id)
+            if driver_obj is None:
+                continue
+            
+            _failed_driver_ids.remove(driver_id)
+            _driver_pool.append(driver_obj)
+            _driver_queue.put_nowait(driver_obj)
+            print(f"[+] Driver #{driver_id} restored to pool ({len(_driver_pool)} total)")
+
+
+def schedule_refill():
+    """Start refill_driver_pool() in the background if slots need relaunching"""
+    # Skip if a refill is already running rather than queueing behind it
+    if _failed_driver_ids and not _refill_lock.locked():
+        spawn_background(refill_driver_pool())
+
+
+async def return_driver(driver_obj):
+    """Unload the page, enforce the memory limit and put the driver back in the pool"""
+    driver_id = driver_obj['id']
+    
+    try:
+        # Unload the page so the idle driver doesn't keep it (and its JS) in memory
+        try:
+            await asyncio.to_thread(driver_obj['driver'].get, 'about:blank')
+        except Exception as e:
+            print(f"[Driver-{driver_id}] Failed to unload page: {e}")
+        
+        relieved = driver_obj
+        try:
+            relieved = await asyncio.to_thread(relieve_driver, driver_obj)
+        except Exception as e:
+            print(f"[Driver-{driver_id}] Memory check error: {e}")
+        
+        if relieved:
+            _driver_queue.put_nowait(relieved)
+            print(f"[Driver-{driver_id}] Returned to pool")
+        else:
+            schedule_refill()
+    
+    finally:
+        _governor.release()
+
+
+async def relieve_idle_drivers(memory_mb, in_flight):
+    """Run the per-driver relief step on idle drivers, one at a time"""
+    print(f"[*] Memory pressure - checking {_driver_queue.qsize()} idle drivers...")
+    
+    # Only one driver is out of the queue at a time, so admitted requests
+    # can still pick up the others while a driver is being recycled
+    for _ in range(_driver_queue.qsize()):
+        try:
+            driver_obj = _driver_queue.get_nowait()
+        except asyncio.QueueEmpty:
+            break
+        
+        relieved = driver_obj
+        try:
+            relieved = await asyncio.to_thread(relieve_driver, driver_obj)
+        except Exception as e:
+            print(f"[Driver-{driver_obj['id']}] Memory check error: {e}")
+        finally:
+            if relieved:
+                _driver_queue.put_nowait(relieved)
+        
+        if relieved is None:
+            schedule_refill()
+
+
+_governor = MemoryGovernor(
+    get_pids=lambda: [browser_pid(driver_obj['driver']) for driver_obj in list(_driver_pool)],
+    on_pressure=relieve_idle_drivers
+)
+
+
 def bypass_cloudflare(driver, max_attempts=20):
     """Bypass Cloudflare using your working Tab+Space technique"""
     print("[*] Checking for Cloudflare challenge...")
@@ -172,8 +334,40 @@ async def fetch_url_with_driver(url: str, timeout: int):
             error="Driver pool not initialized"
         )
     
+    # Wait for memory headroom before taking a driver
+    if not await _governor.admit():
+        return FetchResponse(
+            success=False,
+            html=None,
+            final_url=None,
+            cloudflare_bypassed=False,
+            error="Chrome memory budget exceeded, try again later"
+        )
+    
+    schedule_refill()
+    
+    if not _driver_pool:
+        _governor.release()
+        return FetchResponse(
+            success=False,
+            html=None,
+            final_url=None,
+            cloudflare_bypassed=False,
+            error="No Chrome drivers available"
+        )
+    
     # Get a driver from the pool (waits if all busy)
-    driver_obj = await _driver_queue.get()
+    try:
+        driver_obj = await asyncio.wait_for(_driver_queue.get(), timeout=ADMISSION_TIMEOUT)
+    except asyncio.TimeoutError:
+        _governor.release()
+        return FetchResponse(
+            success=False,
+            html=None,
+            final_url=None,
+            cloudflare_bypassed=False,
+            error=f"No Chrome driver free after {ADMISSION_TIMEOUT}s"
+        )
     driver = driver_obj['driver']
     driver_id = driver_obj['id']
     
@@ -250,9 +444,8 @@ async def fetch_url_with_driver(url: str, timeout: int):
             )
     
     finally:
-        # Return driver to pool
-        await _driver_queue.put(driver_obj)
-        print(f"[Driver-{driver_id}] Returned to pool")
+        # Unload, memory check and recycle happen after the response is sent
+        spawn_background(return_driver(driver_obj))
 
 
 @asynccontextmanager
@@ -0,0 +1,108 @@
+import asyncio
+import os
+
+import memory_governor
+from memory_governor import MemoryGovernor, process_tree_pids
+
+
+def _governor(memory_mb, **kwargs):
+    """Governor whose sampled memory is a fixed value"""
+    kwargs.setdefault('budget_mb', 100)
+    kwargs.setdefault('sample_interval', 0.01)
+    kwargs.setdefault('admission_timeout', 0.05)
+    governor = MemoryGovernor(get_pids=lambda: [], **kwargs)
+    governor.sample_memory_mb = lambda force=False: memory_mb
+    return governor
+
+
+def test_process_tree_pids_includes_descendants(monkeypatch):
+    parents = {10: 1, 11: 10, 12: 11, 13: 10, 20: 1, 21: 20}
+    monkeypatch.setattr(memory_governor, '_parent_map', lambda: parents)
+
+    assert process_tree_pids([10]) == {10, 11, 12, 13}
+    assert process_tree_pids([11, 20]) == {11, 12, 20, 21}
+
+
+def test_process_tree_pids_ignores_missing_roots(monkeypatch):
+    monkeypatch.setattr(memory_governor, '_parent_map', lambda: {})
+
+    assert process_tree_pids([None]) == set()
+    assert process_tree_pids([]) == set()
+
+
+def test_process_tree_memory_mb_measures_own_process():
+    assert memory_governor.process_tree_memory_mb([os.getpid()]) > 0
+
+
+def test_admit_under_budget():
+    governor = _governor(50)
+
+    async def run():
+        return [await governor.admit() for _ in range(3)]
+
+    assert asyncio.run(run()) == [True, True, True]
+    assert governor.in_flight == 3
+
+
+def test_admit_always_admits_one_when_idle():
+    governor = _governor(500)
+
+    assert asyncio.run(governor.admit()) is True
+    assert governor.in_flight == 1
+
+
+def test_admit_times_out_over_budget():
+    governor = _governor(500)
+
+    async def run():
+        return await governor.admit(), await governor.admit()
+
+    assert asyncio.run(run()) == (True, False)
+    assert governor.in_flight == 1
+
+
+def test_relief_runs_once_per_cooldown():
+    calls = []
+    governor = _governor(500, on_pressure=lambda memory, in_flight: calls.append(in_flight),
+                         relief_cooldown=60)
+    governor.in_flight = 1
+
+    async def run():
+        await governor.admit()
+        await governor.admit()
+
+    asyncio.run(run())
+    assert calls == [1]
+    assert governor.relief_runs == 1
+
+
+def test_async_relief_is_awaited():
+    calls = []
+
+    async def on_pressure(memory, in_flight):
+        calls.append(memory)
+
+    governor = _governor(500, on_pressure=on_pressure)
+
+    asyncio.run(governor.admit())
+    assert calls == [500]
+
+
+def test_over_budget_logged_once(capsys):
+    governor = _governor(500, relief_cooldown=60)
+    governor.in_flight = 1
+
+    async def run():
+        await governor.admit()
+
+    asyncio.run(run())
+    assert capsys.readouterr().out.count('over budget') == 1
+
+
+def test_release_never_goes_negative():
+    governor = _governor(50)
+    asyncio.run(governor.admit())
+
+    governor.release()
+    governor.release()
+    assert governor.in_flight == 0